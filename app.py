@@ -141,7 +141,7 @@ if st.session_state["phone_valid"]:
         st.caption("Available points: (not available yet)")
 
     amount = st.number_input("Enter payment amount:", min_value=0.01, step=0.01, format="%.2f")
-    method = st.selectbox("Payment Method", ["Cash", "Check", "Credit Card"])
+    method = st.selectbox("Payment Method", storage.PAYMENT_METHODS)
 
     # Rewards picker (label without '(optional)')
     eligible = [(c, cash) for (c, cash) in storage.REWARD_TIERS if current_pts_for_ui >= c]
@@ -223,8 +223,36 @@ if all(k in st.secrets for k in required):
             help="Download the latest customers.xlsx (includes total points per phone)"
         )
 
-# ---- Admin: Clear all data ----
+# ---- Admin: Bulk import payments ----
 st.divider()
+with st.expander("Admin • Bulk import payments"):
+    st.caption(
+        "Upload historical payments as CSV or XLSX. Required columns: phone, original_amount, method, timestamp "
+        "(optional: birthday_discount, reward_discount, points_redeemed, final_amount). "
+        "Rows already in payments.xlsx are skipped; everything is published in one commit. "
+        "Large imports slow down every checkout afterwards, since each one re-reads the whole payments file."
+    )
+    upload = st.file_uploader("Payments file", type=["csv", "xlsx"], key="bulk_import_file")
+    dry_run = st.checkbox("Validate only (don't publish)", value=True)
+    if st.button("Import payments", disabled=upload is None):
+        try:
+            with st.spinner("Importing..."):
+                report = storage.import_payments(upload, filename=upload.name, dry_run=dry_run)
+            summary = (
+                f"Rows read: {report['rows_read']} | Imported: {report['imported']} | "
+                f"Duplicates skipped: {report['duplicates']} | Rejected: {report['rejected']} | "
+                f"Customers updated: {report['customers_updated']} | {report['seconds']:.1f}s"
+            )
+            if dry_run:
+                st.info("Dry run — nothing published.\n\n" + summary)
+            else:
+                st.success(summary)
+            if report["rejected_samples"]:
+                st.dataframe(report["rejected_samples"])
+        except Exception as e:
+            st.error(f"Failed to import payments: {e}")
+
+# ---- Admin: Clear all data ----
 with st.expander("Admin • Clear all data"):
     st.warning("This will erase all rows in customers.xlsx, payments.xlsx, redemptions.xlsx (and vouchers.xlsx if present), keeping only headers.")
     confirm = st.checkbox("I understand this action is irreversible.", value=False)
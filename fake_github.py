@@ -0,0 +1,241 @@
+# fake_github.py — in-memory GitHub API stand-in for load tests (contents + git data endpoints)
+import base64
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# GitHub stops inlining file content above 1 MB; mirror that so the raw fallback is exercised.
+INLINE_CONTENT_LIMIT = 1024 * 1024
+
+
+class FakeGitHub:
+    """A single-repo, single-process GitHub fake with real SHA/ref semantics.
+
+    PUT /contents requires the current blob sha (409 on mismatch) and
+    PATCH /git/refs refuses non fast-forward updates (422), exactly the
+    conditions storage_github.py retries on.
+    """
+
+    def __init__(self, owner: str = "user", repo: str = "repo", branch: str = "main", latency: float = 0.0):
+        self.owner = owner
+        self.repo = repo
+        self.branch = branch
+        self.latency = latency
+        self.blobs: dict[str, bytes] = {}
+        self.trees: dict[str, dict[str, str]] = {}
+        self.commits: dict[str, dict] = {}
+        self.refs: dict[str, str] = {}
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self.refs[branch] = self._new_commit({}, [], "Initial commit")
+
+    # ---- object store ----
+    def _new_blob(self, content: bytes) -> str:
+        sha = hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+        self.blobs[sha] = content
+        return sha
+
+    def _new_tree(self, entries: dict[str, str]) -> str:
+        sha = hashlib.sha1(json.dumps(entries, sort_keys=True).encode()).hexdigest()
+        self.trees[sha] = dict(entries)
+        return sha
+
+    def _new_commit(self, entries: dict[str, str], parents: list[str], message: str) -> str:
+        tree_sha = self._new_tree(entries)
+        body = json.dumps({"tree": tree_sha, "parents": parents, "message": message, "n": len(self.commits)})
+        sha = hashlib.sha1(body.encode()).hexdigest()
+        self.commits[sha] = {"tree": tree_sha, "parents": parents, "message": message}
+        return sha
+
+    def _resolve(self, ref: str | None) -> str | None:
+        ref = ref or self.branch
+        if ref in self.refs:
+            return self.refs[ref]
+        return ref if ref in self.commits else None
+
+    def _entries(self, commit_sha: str) -> dict[str, str]:
+        return self.trees[self.commits[commit_sha]["tree"]]
+
+    # ---- public helpers ----
+    def seed(self, files: dict[str, bytes], message: str = "Seed data") -> str:
+        with self._lock:
+            head = self.refs[self.branch]
+            entries = dict(self._entries(head))
+            for path, content in files.items():
+                entries[path] = self._new_blob(content)
+            self.refs[self.branch] = self._new_commit(entries, [head], message)
+            return self.refs[self.branch]
+
+    def read_file(self, path: str) -> bytes | None:
+        with self._lock:
+            blob_sha = self._entries(self.refs[self.branch]).get(path)
+            return self.blobs[blob_sha] if blob_sha else None
+
+    def stats_snapshot(self) -> Counter:
+        """Copy of the per-status request counters, safe while requests are in flight."""
+        with self._lock:
+            return Counter(self.stats)
+
+    def commit_count(self) -> int:
+        with self._lock:
+            n, sha = 0, self.refs[self.branch]
+            while self.commits[sha]["parents"]:
+                n += 1
+                sha = self.commits[sha]["parents"][0]
+            return n
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        fake = self
+
+        class Handler(_Handler):
+            pass
+
+        Handler.fake = fake
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return f"http://{host}:{self._server.server_address[1]}"
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    # ---- request handling (called by _Handler) ----
+    def handle(self, method: str, path: str, query: dict, headers, body: dict | None):
+        if self.latency:
+            time.sleep(self.latency)
+        prefix = f"/repos/{self.owner}/{self.repo}/"
+        if not path.startswith(prefix):
+            return 404, {"message": "Not Found"}
+        route = path[len(prefix):]
+
+        m = re.fullmatch(r"contents/(.+)", route)
+        if m and method == "GET":
+            return self._get_contents(m.group(1), query.get("ref", [None])[0], headers.get("Accept", ""))
+        if m and method == "PUT":
+            return self._put_contents(m.group(1), body or {})
+        m = re.fullmatch(r"git/ref/heads/(.+)", route)
+        if m and method == "GET":
+            with self._lock:
+                sha = self.refs.get(m.group(1))
+            if not sha:
+                return 404, {"message": "Not Found"}
+            return 200, {"ref": f"refs/heads/{m.group(1)}", "object": {"type": "commit", "sha": sha}}
+        m = re.fullmatch(r"git/refs/heads/(.+)", route)
+        if m and method == "PATCH":
+            return self._update_ref(m.group(1), body or {})
+        m = re.fullmatch(r"git/commits/([0-9a-f]+)", route)
+        if m and method == "GET":
+            with self._lock:
+                c = self.commits.get(m.group(1))
+            if not c:
+                return 404, {"message": "Not Found"}
+            return 200, {"sha": m.group(1), "tree": {"sha": c["tree"]}, "message": c["message"],
+                         "parents": [{"sha": p} for p in c["parents"]]}
+        if route == "git/commits" and method == "POST":
+            with self._lock:
+                tree = self.trees.get(body.get("tree"))
+                if tree is None:
+                    return 422, {"message": "Tree SHA does not exist"}
+                sha = self._new_commit(tree, list(body.get("parents", [])), body.get("message", ""))
+            return 201, {"sha": sha}
+        if route == "git/blobs" and method == "POST":
+            with self._lock:
+                sha = self._new_blob(base64.b64decode(body.get("content", "")))
+            return 201, {"sha": sha}
+        if route == "git/trees" and method == "POST":
+            with self._lock:
+                entries = dict(self.trees.get(body.get("base_tree"), {}))
+                for item in body.get("tree", []):
+                    entries[item["path"]] = item["sha"]
+                sha = self._new_tree(entries)
+            return 201, {"sha": sha}
+        return 404, {"message": "Not Found"}
+
+    def _get_contents(self, path: str, ref: str | None, accept: str):
+        with self._lock:
+            commit_sha = self._resolve(ref)
+            blob_sha = self._entries(commit_sha).get(path) if commit_sha else None
+            content = self.blobs.get(blob_sha) if blob_sha else None
+        if content is None:
+            return 404, {"message": "Not Found"}
+        if "application/vnd.github.raw" in accept:
+            return 200, content
+        inline = len(content) <= INLINE_CONTENT_LIMIT
+        return 200, {
+            "type": "file", "path": path, "sha": blob_sha, "size": len(content),
+            "encoding": "base64" if inline else "none",
+            "content": base64.b64encode(content).decode("utf-8") if inline else "",
+        }
+
+    def _put_contents(self, path: str, body: dict):
+        branch = body.get("branch") or self.branch
+        with self._lock:
+            head = self.refs.get(branch)
+            if not head:
+                return 404, {"message": "Branch not found"}
+            entries = dict(self._entries(head))
+            current = entries.get(path)
+            if current and not body.get("sha"):
+                return 422, {"message": "Invalid request. \"sha\" wasn't supplied."}
+            if body.get("sha") != current:
+                return 409, {"message": f"{path} does not match {body.get('sha')}"}
+            entries[path] = self._new_blob(base64.b64decode(body.get("content", "")))
+            self.refs[branch] = self._new_commit(entries, [head], body.get("message", ""))
+            return (200 if current else 201), {"content": {"path": path, "sha": entries[path]},
+                                              "commit": {"sha": self.refs[branch]}}
+
+    def _update_ref(self, branch: str, body: dict):
+        with self._lock:
+            head = self.refs.get(branch)
+            new = body.get("sha")
+            if not head or new not in self.commits:
+                return 422, {"message": "Reference does not exist"}
+            if not body.get("force") and head not in self.commits[new]["parents"]:
+                return 422, {"message": "Update is not a fast forward"}
+            self.refs[branch] = new
+            return 200, {"ref": f"refs/heads/{branch}", "object": {"type": "commit", "sha": new}}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    fake: FakeGitHub
+    protocol_version = "HTTP/1.1"
+
+    def _dispatch(self, method: str):
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        status, payload = self.fake.handle(method, url.path, parse_qs(url.query), self.headers, body)
+        with self.fake._lock:
+            self.fake.stats[f"{method} {status}"] += 1
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream" if isinstance(payload, bytes) else "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,354 @@
+# loadtest.py — simulate several tills driving app.py against a local fake GitHub
+"""
+Each cashier runs in its own process with its own Streamlit AppTest session
+(AppTest swaps process-wide state, so sessions can't share a process), all
+talking to one FakeGitHub server. A visit is: phone lookup, profile save for
+new customers, then a checkout (returning customers may redeem a reward).
+
+    python loadtest.py --cashiers 4 --visits 10 --latency-ms 50
+"""
+import argparse
+import io
+import json
+import math
+import multiprocessing as mp
+import os
+import queue
+import random
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from fake_github import FakeGitHub
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+PAYMENT_COLUMNS = [
+    "phone", "original_amount", "birthday_discount", "reward_discount",
+    "points_redeemed", "final_amount", "method", "timestamp",
+]
+
+# =========================
+# Seed data
+# =========================
+def _xlsx(df: pd.DataFrame) -> bytes:
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine="openpyxl") as writer:
+        df.to_excel(writer, index=False)
+    return buf.getvalue()
+
+def _seed_files(n_customers: int, seed_points: float) -> tuple[dict[str, bytes], list[str]]:
+    """Returning customers, each with one recent payment worth seed_points."""
+    phones = [f"5{i:07d}" for i in range(n_customers)]
+    yesterday = (datetime.now() - timedelta(days=1)).isoformat(timespec="seconds")
+    customers = pd.DataFrame({"phone": phones, "birthday": "1990-01-15", "total_points": seed_points})
+    payments = pd.DataFrame([{
+        "phone": p, "original_amount": seed_points, "birthday_discount": 0.0, "reward_discount": 0.0,
+        "points_redeemed": 0.0, "final_amount": seed_points, "method": "Cash", "timestamp": yesterday,
+    } for p in phones], columns=PAYMENT_COLUMNS)
+    redemptions = pd.DataFrame(columns=["phone", "points", "timestamp"])
+    files = {
+        "customers.xlsx": _xlsx(customers),
+        "payments.xlsx": _xlsx(payments),
+        "redemptions.xlsx": _xlsx(redemptions),
+    }
+    return files, phones
+
+# =========================
+# Cashier process
+# =========================
+def _button(at, label: str):
+    return next(b for b in at.button if b.label == label)
+
+def _errors(at) -> str:
+    msgs = [e.value for e in at.error] + [str(e.value) for e in at.exception]
+    return " | ".join(msgs)
+
+def _timed(records: list, at, op: str, action, **extra) -> bool:
+    t0 = time.perf_counter()
+    try:
+        action()
+        error = _errors(at)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    records.append({"op": op, "seconds": time.perf_counter() - t0, "ok": not error, "error": error, **extra})
+    return not error
+
+def _run_cashier(cashier: int, base_url: str, returning: list[str], cfg: dict, barrier, results) -> None:
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(cfg["seed"] * 1000 + cashier)
+    secrets = {
+        "GITHUB_TOKEN": "loadtest",
+        "GITHUB_OWNER": cfg["owner"],
+        "GITHUB_REPO": cfg["repo"],
+        "GITHUB_BRANCH": cfg["branch"],
+        "GITHUB_API_BASE": base_url,
+    }
+
+    def new_session():
+        at = AppTest.from_file(APP_PATH, default_timeout=cfg["timeout"])
+        at.secrets.update(secrets)
+        return at.run()
+
+    records = []
+    started = False
+    try:
+        new_session()  # warm-up: imports app + storage before the clock starts
+        barrier.wait()
+        started = True
+        for visit in range(cfg["visits"]):
+            is_new = rng.random() < cfg["new_ratio"]
+            phone = f"9{cashier:03d}{visit:04d}" if is_new else rng.choice(returning)
+            # Unique to the cent per checkout, so every payment row can be traced back to its visit.
+            amount = round(100 + (cashier * cfg["visits"] + visit) / 100, 2)
+            base = {"cashier": cashier, "phone": phone}
+            try:
+                at = new_session()
+            except Exception as e:
+                records.append({"op": "session", "seconds": 0.0, "ok": False, "error": str(e), **base})
+                continue
+
+            at.text_input[0].input(phone)
+            if not _timed(records, at, "lookup", lambda: _button(at, "Next").click().run(), **base):
+                continue
+
+            if is_new:
+                bday = date(1980 + rng.randrange(25), rng.randrange(1, 13), rng.randrange(1, 29))
+                at.date_input(key="new_bday").set_value(bday)
+                if not _timed(records, at, "save_profile", lambda: _button(at, "Save Profile").click().run(), **base):
+                    continue
+
+            at.number_input[0].set_value(amount)
+            redeem = False
+            if not is_new and rng.random() < cfg["redeem_ratio"]:
+                picker = next(s for s in at.selectbox if s.label == "Apply reward discount")
+                offers = [o for o in picker.options if o != "No reward"]
+                if offers:
+                    picker.set_value(offers[0])
+                    redeem = True
+            _timed(records, at, "checkout", lambda: _button(at, "Submit Payment").click().run(),
+                   amount=amount, redeem=redeem, **base)
+            if records[-1]["ok"]:
+                captions = " ".join(c.value for c in at.caption)
+                records[-1]["redeemed"] = redeem and "Reward discount: 0.00" not in captions
+    except Exception as e:
+        # Anything outside _timed (missing widget, app layout change) ends this till; report why.
+        records.append({"op": "cashier", "seconds": 0.0, "ok": False, "cashier": cashier,
+                        "error": f"cashier {cashier} crashed: {type(e).__name__}: {e}"})
+        if not started:
+            barrier.abort()
+    finally:
+        results.put(records)
+
+# =========================
+# Analysis
+# =========================
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    # Nearest-rank: the smallest value with at least pct% of samples at or below it.
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[k]
+
+def _read_df(fake: FakeGitHub, path: str) -> pd.DataFrame:
+    content = fake.read_file(path)
+    if not content:
+        return pd.DataFrame()
+    return pd.read_excel(io.BytesIO(content), keep_default_na=False)
+
+def _integrity(fake: FakeGitHub, records: list[dict]) -> dict:
+    payments = _read_df(fake, "payments.xlsx")
+    redemptions = _read_df(fake, "redemptions.xlsx")
+    customers = _read_df(fake, "customers.xlsx")
+
+    keys = Counter(
+        f"{p}|{float(a):.2f}" for p, a in zip(payments["phone"].astype(str), payments["original_amount"])
+    )
+    checkouts = [r for r in records if r["op"] == "checkout"]
+    ok_keys = {f"{r['phone']}|{r['amount']:.2f}" for r in checkouts if r["ok"]}
+    failed_keys = {f"{r['phone']}|{r['amount']:.2f}" for r in checkouts if not r["ok"]}
+
+    saved = {r["phone"] for r in records if r["op"] == "save_profile" and r["ok"]}
+    customer_phones = Counter(customers["phone"].astype(str)) if not customers.empty else Counter()
+    expected_redemptions = sum(1 for r in checkouts if r["ok"] and r.get("redeemed"))
+
+    # Balances as calculate_total_points would see them now (all rows are within the expiry window).
+    earned = payments.groupby(payments["phone"].astype(str))["original_amount"].sum()
+    spent = (redemptions.groupby(redemptions["phone"].astype(str))["points"].sum()
+             if not redemptions.empty else pd.Series(dtype=float))
+    truth = earned.sub(spent, fill_value=0.0).clip(lower=0.0)
+    stored = customers.set_index(customers["phone"].astype(str))["total_points"].astype(float)
+    stale = int((stored - truth.reindex(stored.index).fillna(0.0)).abs().gt(0.01).sum())
+
+    return {
+        "payment_rows": int(len(payments)),
+        "lost_payments": len(ok_keys - set(keys)),
+        "duplicated_payments": sum(n - 1 for n in keys.values() if n > 1),
+        "orphan_payments": len(failed_keys & set(keys)),
+        "expected_redemptions": expected_redemptions,
+        "redemption_rows": int(len(redemptions)),
+        "lost_customers": len(saved - set(customer_phones)),
+        "duplicated_customers": sum(n - 1 for n in customer_phones.values() if n > 1),
+        "stale_balances": stale,
+    }
+
+def _summarize(records: list[dict], stats: Counter, wall: float, fake: FakeGitHub, cfg: dict) -> dict:
+    ops = {}
+    for op in ("lookup", "save_profile", "checkout"):
+        rs = [r for r in records if r["op"] == op]
+        lat = [r["seconds"] for r in rs if r["ok"]]
+        ops[op] = {
+            "count": len(rs),
+            "failed": sum(1 for r in rs if not r["ok"]),
+            "p50_s": round(_percentile(lat, 50), 3),
+            "p95_s": round(_percentile(lat, 95), 3),
+            "p99_s": round(_percentile(lat, 99), 3),
+            "max_s": round(max(lat), 3) if lat else 0.0,
+        }
+    puts = sum(n for k, n in stats.items() if k.startswith("PUT "))
+    conflicts = stats.get("PUT 409", 0)
+    requests_total = sum(stats.values())
+    checkouts_ok = ops["checkout"]["count"] - ops["checkout"]["failed"]
+    errors = Counter(r["error"].splitlines()[0][:160] for r in records if not r["ok"])
+    return {
+        "config": cfg,
+        "wall_seconds": round(wall, 2),
+        "cashier_crashes": sum(1 for r in records if r["op"] == "cashier"),
+        "throughput": {
+            "checkouts_per_min": round(checkouts_ok / wall * 60, 2) if wall else 0.0,
+            "visits": cfg["cashiers"] * cfg["visits"],
+        },
+        "latency": ops,
+        "github": {
+            "requests": requests_total,
+            "requests_per_checkout": round(requests_total / max(1, ops["checkout"]["count"]), 1),
+            "puts": puts,
+            "conflicts_409": conflicts,
+            "conflict_rate": round(conflicts / puts, 4) if puts else 0.0,
+            "retries_per_successful_write": round(conflicts / max(1, puts - conflicts), 4),
+            "commits": fake.commit_count(),
+            "status_counts": dict(sorted(stats.items())),
+        },
+        "integrity": _integrity(fake, records),
+        "top_errors": dict(errors.most_common(5)),
+    }
+
+def _markdown(summary: dict) -> str:
+    cfg, g, i = summary["config"], summary["github"], summary["integrity"]
+    lines = [
+        "# Load test report",
+        "",
+        f"{cfg['cashiers']} cashiers x {cfg['visits']} visits, new-customer ratio {cfg['new_ratio']}, "
+        f"redeem ratio {cfg['redeem_ratio']}, fake GitHub latency {cfg['latency_ms']} ms, seed {cfg['seed']}.",
+        "",
+        f"- Wall time: {summary['wall_seconds']} s",
+        f"- Cashier crashes: {summary['cashier_crashes']} (see top errors)",
+        f"- Throughput: {summary['throughput']['checkouts_per_min']} successful checkouts/min",
+        "",
+        "| op | count | failed | p50 s | p95 s | p99 s | max s |",
+        "|---|---|---|---|---|---|---|",
+    ]
+    for op, m in summary["latency"].items():
+        lines.append(f"| {op} | {m['count']} | {m['failed']} | {m['p50_s']} | {m['p95_s']} | {m['p99_s']} | {m['max_s']} |")
+    lines += [
+        "",
+        "## GitHub storage",
+        "",
+        f"- Requests: {g['requests']} ({g['requests_per_checkout']} per checkout visit)",
+        f"- PUTs: {g['puts']}, 409 conflicts: {g['conflicts_409']} (rate {g['conflict_rate']:.2%}), "
+        f"retries per successful write: {g['retries_per_successful_write']}",
+        f"- Commits on branch: {g['commits']}",
+        "",
+        "## Data integrity",
+        "",
+    ]
+    lines += [f"- {k.replace('_', ' ')}: {v}" for k, v in i.items()]
+    if summary["top_errors"]:
+        lines += ["", "## Top errors", ""]
+        lines += [f"- ({n}x) {e}" for e, n in summary["top_errors"].items()]
+    return "\n".join(lines) + "\n"
+
+# =========================
+# Entry point
+# =========================
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description="Multi-cashier load test for app.py + storage_github.py")
+    parser.add_argument("--cashiers", type=int, default=4, help="concurrent tills (one process each)")
+    parser.add_argument("--visits", type=int, default=10, help="customer visits per cashier")
+    parser.add_argument("--customers", type=int, default=20, help="seeded returning customers shared by all tills")
+    parser.add_argument("--new-ratio", type=float, default=0.3, help="share of visits by new customers")
+    parser.add_argument("--redeem-ratio", type=float, default=0.5, help="share of returning visits that redeem")
+    parser.add_argument("--seed-points", type=float, default=500.0, help="points each seeded customer starts with")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="added latency per fake GitHub request")
+    parser.add_argument("--timeout", type=float, default=120.0, help="AppTest timeout per script run (s)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--report", default="loadtest_report.md", help="markdown summary path")
+    parser.add_argument("--json", dest="json_path", default=None, help="optional JSON summary path")
+    args = parser.parse_args(argv)
+
+    cfg = {
+        "cashiers": args.cashiers, "visits": args.visits, "customers": args.customers,
+        "new_ratio": args.new_ratio, "redeem_ratio": args.redeem_ratio, "latency_ms": args.latency_ms,
+        "timeout": args.timeout, "seed": args.seed, "owner": "loadtest", "repo": "data", "branch": "main",
+    }
+    fake = FakeGitHub(owner=cfg["owner"], repo=cfg["repo"], branch=cfg["branch"], latency=args.latency_ms / 1000)
+    files, seed_phones = _seed_files(args.customers, args.seed_points)
+    fake.seed(files)
+    base_url = fake.start()
+
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(args.cashiers + 1)
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=_run_cashier, args=(c, base_url, seed_phones, cfg, barrier, results), daemon=True)
+        for c in range(args.cashiers)
+    ]
+    for p in procs:
+        p.start()
+    try:
+        barrier.wait(timeout=300)
+        stats_before = fake.stats_snapshot()
+        t0 = time.perf_counter()
+        records = []
+        for _ in procs:
+            records.extend(results.get(timeout=args.timeout * args.visits * 4))
+        wall = time.perf_counter() - t0
+    except (queue.Empty, threading.BrokenBarrierError) as e:
+        # Collect whatever crash reports the cashiers managed to send.
+        causes = []
+        while True:
+            try:
+                causes += [r["error"] for r in results.get(timeout=5) if r["op"] == "cashier"]
+            except queue.Empty:
+                break
+        detail = "; ".join(causes) or "no cashier reported an error"
+        raise RuntimeError(f"Load test did not finish: {type(e).__name__} ({detail})") from e
+    finally:
+        for p in procs:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        # The repo stays readable in memory for the analysis below.
+        fake.stop()
+
+    stats = fake.stats_snapshot()
+    stats.subtract(stats_before)
+    summary = _summarize(records, +stats, wall, fake, cfg)
+
+    report = _markdown(summary)
+    with open(args.report, "w", encoding="utf-8") as f:
+        f.write(report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    print(report)
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -5,9 +5,12 @@ import os
 import time
 from datetime import datetime, date, timedelta
 
+import numpy as np
 import pandas as pd
 import requests
+from dateutil.tz import tzlocal
 import streamlit as st
+from openpyxl import load_workbook
 
 # =========================
 # Secrets / Config
@@ -21,11 +24,13 @@ PAYMENTS_PATH     = st.secrets.get("GITHUB_FILE_PATH",        os.environ.get("GI
 CUSTOMERS_PATH    = st.secrets.get("GITHUB_CUSTOMERS_PATH",   os.environ.get("GITHUB_CUSTOMERS_PATH", "customers.xlsx"))
 REDEMPTIONS_PATH  = st.secrets.get("GITHUB_REDEMPTIONS_PATH", os.environ.get("GITHUB_REDEMPTIONS_PATH", "redemptions.xlsx"))
 
-API_BASE = "https://api.github.com"
+API_BASE = st.secrets.get("GITHUB_API_BASE", os.environ.get("GITHUB_API_BASE", "https://api.github.com"))
 
 # Rewards tiers (points_cost -> $off). Admin can edit here.
 REWARD_TIERS = [(100, 5), (250, 15), (500, 40)]
 
+PAYMENT_METHODS = ["Cash", "Check", "Credit Card"]
+
 # Loyalty config
 BASE_POINTS_PER_CURRENCY = 1.0
 WINDOW_DAYS = 7
@@ -48,19 +53,29 @@ def _headers():
 def _contents_url(path: str) -> str:
     return f"{API_BASE}/repos/{OWNER}/{REPO}/contents/{path}"
 
-def _get_file_info(path: str):
-    r = requests.get(_contents_url(path), headers=_headers(), params={"ref": BRANCH})
+def _get_file_info(path: str, ref: str | None = None):
+    r = requests.get(_contents_url(path), headers=_headers(), params={"ref": ref or BRANCH})
     if r.status_code == 200:
         data = r.json()
         try:
             content_bytes = base64.b64decode(data["content"])
         except Exception:
             content_bytes = None
+        if not content_bytes and data.get("size"):
+            # Files over 1 MB come back without inline content; fetch the raw blob instead.
+            content_bytes = _get_raw_file(path, ref)
         return data.get("sha"), content_bytes
     if r.status_code == 404:
         return None, None
     raise RuntimeError(f"GitHub GET {path} failed: {r.status_code} {r.text}")
 
+def _get_raw_file(path: str, ref: str | None = None) -> bytes | None:
+    headers = {**_headers(), "Accept": "application/vnd.github.raw"}
+    r = requests.get(_contents_url(path), headers=headers, params={"ref": ref or BRANCH})
+    if r.status_code == 200:
+        return r.content
+    raise RuntimeError(f"GitHub GET raw {path} failed: {r.status_code} {r.text}")
+
 def _commit_file(path: str, content_bytes: bytes, message: str, sha: str | None):
     payload = {
         "message": message,
@@ -82,6 +97,53 @@ def _commit_file(path: str, content_bytes: bytes, message: str, sha: str | None)
         hint.append(f"Check branch '{BRANCH}' exists and path '{path}' is correct.")
     raise RuntimeError(f"GitHub PUT {path} failed: {r.status_code} {r.text}\n" + "\n".join(map(str, hint)))
 
+def _git_url(suffix: str) -> str:
+    return f"{API_BASE}/repos/{OWNER}/{REPO}/git/{suffix}"
+
+def _get_branch_head() -> str:
+    r = requests.get(_git_url(f"ref/heads/{BRANCH}"), headers=_headers())
+    if r.status_code == 200:
+        return r.json()["object"]["sha"]
+    raise RuntimeError(f"GitHub GET ref heads/{BRANCH} failed: {r.status_code} {r.text}")
+
+def _commit_files(files: dict[str, bytes], message: str, parent_sha: str) -> str:
+    """Publish several files as a single commit on top of parent_sha (Git Data API).
+
+    The branch ref is moved without force, so a concurrent commit makes this
+    raise a 422 (not a fast-forward) and the caller can rebuild and retry.
+    """
+    r = requests.get(_git_url(f"commits/{parent_sha}"), headers=_headers())
+    if r.status_code != 200:
+        raise RuntimeError(f"GitHub GET commit {parent_sha} failed: {r.status_code} {r.text}")
+    base_tree = r.json()["tree"]["sha"]
+
+    tree = []
+    for path, content_bytes in files.items():
+        r = requests.post(_git_url("blobs"), headers=_headers(), json={
+            "content": base64.b64encode(content_bytes).decode("utf-8"),
+            "encoding": "base64",
+        })
+        if r.status_code != 201:
+            raise RuntimeError(f"GitHub POST blob {path} failed: {r.status_code} {r.text}")
+        tree.append({"path": path, "mode": "100644", "type": "blob", "sha": r.json()["sha"]})
+
+    r = requests.post(_git_url("trees"), headers=_headers(), json={"base_tree": base_tree, "tree": tree})
+    if r.status_code != 201:
+        raise RuntimeError(f"GitHub POST tree failed: {r.status_code} {r.text}")
+    tree_sha = r.json()["sha"]
+
+    r = requests.post(_git_url("commits"), headers=_headers(), json={
+        "message": message, "tree": tree_sha, "parents": [parent_sha],
+    })
+    if r.status_code != 201:
+        raise RuntimeError(f"GitHub POST commit failed: {r.status_code} {r.text}")
+    commit_sha = r.json()["sha"]
+
+    r = requests.patch(_git_url(f"refs/heads/{BRANCH}"), headers=_headers(), json={"sha": commit_sha, "force": False})
+    if r.status_code == 200:
+        return commit_sha
+    raise RuntimeError(f"GitHub PATCH ref heads/{BRANCH} failed: {r.status_code} {r.text}")
+
 # =========================
 # Excel helpers
 # =========================
@@ -215,6 +277,8 @@ def update_customer_points(phone: str, total_points: float):
             df = pd.DataFrame(columns=["phone", "birthday", "total_points"])
         if "total_points" not in df.columns:
             df["total_points"] = 0.0
+        # Whole-number points read back from Excel as int64, which rejects fractional assignment.
+        df["total_points"] = pd.to_numeric(df["total_points"], errors="coerce").fillna(0.0).astype(float)
         phone_str = str(phone)
         mask = (df["phone"].astype(str) == phone_str)
         if mask.any():
@@ -406,6 +470,292 @@ def calculate_total_points(phone: str, ref_ts: str) -> float:
     balance = max(0.0, earned - redeemed)
     return round(balance, 2)
 
+# =========================
+# Bulk import (historical payments)
+# =========================
+PAYMENT_COLUMNS = [
+    "phone", "original_amount", "birthday_discount", "reward_discount",
+    "points_redeemed", "final_amount", "method", "timestamp",
+]
+IMPORT_REQUIRED_COLUMNS = ["phone", "original_amount", "method", "timestamp"]
+IMPORT_CHUNK_ROWS = 10_000
+IMPORT_MAX_REJECTED_SAMPLES = 200
+
+def _iter_import_chunks(source, filename: str, chunksize: int):
+    """Yield DataFrames of raw string cells without loading the whole file.
+
+    The first item is an empty frame carrying the (stripped) header, so the
+    caller can check columns even when the file has no data rows.
+    """
+    if filename.lower().endswith(".csv"):
+        try:
+            reader = pd.read_csv(source, chunksize=chunksize, dtype=str, keep_default_na=False)
+        except pd.errors.EmptyDataError:
+            raise ValueError(f"Import file {filename} has no header row") from None
+        with reader:
+            columns = [str(c).strip() for c in reader.get_chunk(0).columns]
+            yield pd.DataFrame(columns=columns, dtype=object)
+            for chunk in reader:
+                chunk.columns = columns
+                yield chunk
+        return
+    if not filename.lower().endswith((".xlsx", ".xlsm")):
+        raise ValueError(f"Unsupported import file type: {filename} (expected .csv or .xlsx)")
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            raise ValueError(f"Import file {filename} has no header row")
+        columns = [str(c).strip() if c is not None else "" for c in header]
+        yield pd.DataFrame(columns=columns, dtype=object)
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= chunksize:
+                yield pd.DataFrame(batch, columns=columns, dtype=object).fillna("")
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns, dtype=object).fillna("")
+    finally:
+        wb.close()
+
+def _normalize_phone_series(s: pd.Series) -> pd.Series:
+    # Spreadsheets often turn 8-digit phones into floats ("12345678.0").
+    return s.astype(str).str.strip().str.replace(r"\.0$", "", regex=True)
+
+def _parse_naive_ts(value: str):
+    try:
+        parsed = pd.Timestamp(value)
+    except (ValueError, TypeError, OverflowError):
+        return pd.NaT
+    return pd.NaT if parsed.tzinfo is not None else parsed
+
+def _normalize_ts_series(s: pd.Series) -> pd.Series:
+    """Parse timestamps to naive local ISO strings (NaN when unparseable).
+
+    Values carrying a UTC offset ("Z", "+02:00") are converted to the local
+    time of this machine, matching the naive datetime.now() stamps the app
+    writes; naive values are kept as-is.
+    """
+    raw = s.astype(str).str.strip()
+    # The offset must follow a time part, or "10-01-2026" would read as offset "-20:26".
+    aware = raw.str.contains(r"\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})$", regex=True)
+    parsed = pd.Series(pd.NaT, index=raw.index, dtype="datetime64[ns]")
+    if aware.any():
+        utc = pd.to_datetime(raw[aware], errors="coerce", format="mixed", utc=True)
+        parsed[aware] = utc.dt.tz_convert(tzlocal()).dt.tz_localize(None)
+    if (~aware).any():
+        try:
+            parsed[~aware] = pd.to_datetime(raw[~aware], errors="coerce", format="mixed")
+        except (ValueError, TypeError):
+            # e.g. named zones slipping past the offset check; fall back to per-value parsing.
+            parsed[~aware] = pd.to_datetime(raw[~aware].map(_parse_naive_ts))
+    return parsed.dt.strftime("%Y-%m-%dT%H:%M:%S")
+
+def _payment_keys(df: pd.DataFrame) -> pd.Series:
+    amounts = pd.to_numeric(df["original_amount"], errors="coerce").round(2)
+    return (
+        _normalize_phone_series(df["phone"]) + "|"
+        + _normalize_ts_series(df["timestamp"]).fillna(df["timestamp"].astype(str)) + "|"
+        + amounts.map("{:.2f}".format) + "|"
+        + df["method"].astype(str).str.strip().str.lower()
+    )
+
+def _validate_import_chunk(chunk: pd.DataFrame) -> tuple[pd.DataFrame, pd.Series]:
+    """Return (clean payment rows, rejection reason per row; "" when valid)."""
+    n = len(chunk)
+
+    def col(name):
+        return chunk[name] if name in chunk.columns else pd.Series([""] * n, index=chunk.index)
+
+    def optional_number(name):
+        raw = col(name).astype(str).str.strip()
+        return pd.to_numeric(raw.where(raw != "", "0"), errors="coerce")
+
+    phone = _normalize_phone_series(col("phone"))
+    amount = pd.to_numeric(col("original_amount"), errors="coerce").round(2)
+    methods = {m.lower(): m for m in PAYMENT_METHODS}
+    method = col("method").astype(str).str.strip().str.lower().map(methods)
+    ts = _normalize_ts_series(col("timestamp"))
+    bday_disc = optional_number("birthday_discount").round(2)
+    reward_disc = optional_number("reward_discount").round(2)
+    pts_redeemed = optional_number("points_redeemed").round(2)
+    final_raw = col("final_amount").astype(str).str.strip()
+    final = pd.to_numeric(final_raw, errors="coerce").round(2)
+    computed_final = (amount - bday_disc - reward_disc).clip(lower=0).round(2)
+    final = final.where(final_raw != "", computed_final)
+
+    def not_finite(values):
+        # NaN from coercion and "inf"/"-inf" alike.
+        return ~np.isfinite(values.astype(float))
+
+    reason = pd.Series("", index=chunk.index)
+    checks = [
+        (~phone.str.fullmatch(r"\d{8}"), "phone must be exactly 8 digits"),
+        (not_finite(amount) | (amount <= 0), "original_amount must be a number > 0"),
+        (method.isna(), f"method must be one of {', '.join(PAYMENT_METHODS)}"),
+        (ts.isna(), "timestamp is not a valid date/time"),
+        (not_finite(bday_disc) | (bday_disc < 0), "birthday_discount must be a number >= 0"),
+        (not_finite(reward_disc) | (reward_disc < 0), "reward_discount must be a number >= 0"),
+        (not_finite(pts_redeemed) | (pts_redeemed < 0), "points_redeemed must be a number >= 0"),
+        (not_finite(final) | (final < 0), "final_amount must be a number >= 0"),
+    ]
+    # Report the first failing check for each row.
+    for failed, msg in reversed(checks):
+        reason = reason.mask(failed.fillna(True), msg)
+
+    clean = pd.DataFrame({
+        "phone": phone,
+        "original_amount": amount,
+        "birthday_discount": bday_disc,
+        "reward_discount": reward_disc,
+        "points_redeemed": pts_redeemed,
+        "final_amount": final,
+        "method": method,
+        "timestamp": ts,
+    })[reason == ""]
+    return clean, reason
+
+def _points_balances(p_df: pd.DataFrame, r_df: pd.DataFrame, phones, ref_date: date) -> pd.Series:
+    """Vectorized calculate_total_points for many phones at once."""
+    cutoff = pd.Timestamp(ref_date - timedelta(days=EXPIRY_DAYS))
+    today = pd.Timestamp(date.today())
+    phones = pd.Index([str(p) for p in phones])
+
+    def recent_sum(df: pd.DataFrame, value_col: str) -> pd.Series:
+        if df.empty or value_col not in df.columns:
+            return pd.Series(0.0, index=phones)
+        d = pd.to_datetime(df["timestamp"].astype(str).str[:19], errors="coerce", format="mixed")
+        d = d.dt.normalize().fillna(today)
+        values = pd.to_numeric(df[value_col], errors="coerce").fillna(0.0)
+        keep = (d >= cutoff).to_numpy()
+        sums = values[keep].groupby(_normalize_phone_series(df["phone"])[keep]).sum()
+        return sums.reindex(phones, fill_value=0.0)
+
+    earned = recent_sum(p_df, "original_amount") * BASE_POINTS_PER_CURRENCY
+    redeemed = recent_sum(r_df, "points")
+    return (earned - redeemed).clip(lower=0.0).round(2)
+
+def import_payments(source, filename: str | None = None, chunksize: int = IMPORT_CHUNK_ROWS,
+                    dry_run: bool = False) -> dict:
+    """Bulk-import historical payments from a CSV/XLSX file in a single commit.
+
+    Rows are streamed and validated chunk by chunk, deduplicated against the
+    payments already stored (a row repeated n times in the file is imported
+    n minus its stored count times), then payments.xlsx, redemptions.xlsx and
+    the affected customers' total_points are published together. Required columns: phone, original_amount, method, timestamp.
+
+    Cost is dominated by parsing/serializing payments.xlsx, and so is every
+    checkout afterwards: the till re-reads the whole sheet, so importing tens
+    of thousands of rows slows the app as a whole, not just the import.
+    """
+    if filename is None:
+        filename = getattr(source, "name", None) or str(source)
+    started = time.perf_counter()
+    ref_ts = datetime.now().isoformat(timespec="seconds")
+
+    # Stream + validate once; a retry after a lost race only redoes dedup on the new head,
+    # so the source never has to be rewound.
+    chunks = _iter_import_chunks(source, filename, chunksize)
+    header = next(chunks).columns
+    missing = [c for c in IMPORT_REQUIRED_COLUMNS if c not in header]
+    if missing:
+        chunks.close()
+        raise ValueError(f"Import file is missing required column(s): {', '.join(missing)}")
+    valid, rejected_samples = [], []
+    rows_read = rejected = 0
+    for chunk in chunks:
+        chunk.index = pd.RangeIndex(rows_read, rows_read + len(chunk)) + 2  # spreadsheet line numbers
+        rows_read += len(chunk)
+
+        clean, reason = _validate_import_chunk(chunk)
+        bad = reason[reason != ""]
+        rejected += len(bad)
+        room = IMPORT_MAX_REJECTED_SAMPLES - len(rejected_samples)
+        if room > 0:
+            rejected_samples.extend({"line": int(i), "reason": r} for i, r in bad.iloc[:room].items())
+        if not clean.empty:
+            valid.append(clean)
+    valid = pd.concat(valid, ignore_index=True) if valid else pd.DataFrame(columns=PAYMENT_COLUMNS)
+    keys = _payment_keys(valid) if not valid.empty else pd.Series(dtype=str)
+    # n-th copy of each key within the file, used for multiset dedup below.
+    occurrence = keys.groupby(keys).cumcount() + 1 if not valid.empty else pd.Series(dtype="int64")
+
+    attempts = 0
+    while True:
+        attempts += 1
+        head = _get_branch_head()
+        _, p_bytes = _get_file_info(PAYMENTS_PATH, ref=head)
+        p_df = _df_from_excel_bytes(p_bytes) if p_bytes else pd.DataFrame(columns=PAYMENT_COLUMNS)
+        for column in PAYMENT_COLUMNS:
+            if column not in p_df.columns:
+                p_df[column] = 0.0 if column not in ("phone", "method", "timestamp") else ""
+
+        # Multiset dedup: a key seen k times in the file and s times in storage imports k - s rows,
+        # so genuine same-day repeats survive while a re-import changes nothing.
+        stored_counts = _payment_keys(p_df).value_counts() if not p_df.empty else pd.Series(dtype="int64")
+        fresh = occurrence > keys.map(stored_counts).fillna(0)
+        new_payments = valid[fresh].reset_index(drop=True)
+        report = {
+            "rows_read": rows_read,
+            "imported": len(new_payments),
+            "duplicates": int((~fresh).sum()),
+            "rejected": rejected,
+            "rejected_samples": rejected_samples,
+            "customers_updated": 0,
+            "commit": None,
+        }
+        if dry_run or new_payments.empty:
+            report["seconds"] = round(time.perf_counter() - started, 2)
+            return report
+
+        # Only needed to publish; read at the same head as payments.
+        _, r_bytes = _get_file_info(REDEMPTIONS_PATH, ref=head)
+        _, c_bytes = _get_file_info(CUSTOMERS_PATH, ref=head)
+        r_df = _df_from_excel_bytes(r_bytes) if r_bytes else pd.DataFrame(columns=["phone", "points", "timestamp"])
+        c_df = _df_from_excel_bytes(c_bytes) if c_bytes else pd.DataFrame(columns=["phone", "birthday", "total_points"])
+
+        new_redemptions = new_payments.loc[new_payments["points_redeemed"] > 0, ["phone", "points_redeemed", "timestamp"]]
+        new_redemptions = new_redemptions.rename(columns={"points_redeemed": "points"})
+        p_df = pd.concat([p_df, new_payments], ignore_index=True)
+        if not new_redemptions.empty:
+            r_df = pd.concat([r_df, new_redemptions], ignore_index=True)
+
+        # Recompute balances for every phone the import touched.
+        affected = new_payments["phone"].unique()
+        balances = _points_balances(p_df, r_df, affected, _parse_ts_to_date(ref_ts))
+        if "total_points" not in c_df.columns:
+            c_df["total_points"] = 0.0
+        c_phones = _normalize_phone_series(c_df["phone"]) if not c_df.empty else pd.Series(dtype=str)
+        known = c_phones.isin(balances.index)
+        c_df["total_points"] = pd.to_numeric(c_df["total_points"], errors="coerce").fillna(0.0).astype(float)
+        c_df.loc[known, "total_points"] = c_phones[known].map(balances).to_numpy()
+        missing_phones = balances.index.difference(pd.Index(c_phones))
+        if len(missing_phones):
+            c_df = pd.concat([c_df, pd.DataFrame({
+                "phone": missing_phones, "birthday": "", "total_points": balances[missing_phones].to_numpy()
+            })], ignore_index=True)
+
+        files = {
+            PAYMENTS_PATH: _excel_bytes_from_df(p_df),
+            CUSTOMERS_PATH: _excel_bytes_from_df(c_df),
+        }
+        if not new_redemptions.empty:
+            files[REDEMPTIONS_PATH] = _excel_bytes_from_df(r_df)
+        message = f"Bulk import {len(new_payments)} payments from {os.path.basename(filename)}"
+        try:
+            report["commit"] = _commit_files(files, message, parent_sha=head)
+        except RuntimeError as e:
+            # Someone else committed meanwhile: rebuild on the new head.
+            if ("422" in str(e) or "409" in str(e)) and attempts < 3:
+                time.sleep(0.8)
+                continue
+            raise
+        report["customers_updated"] = len(balances)
+        report["seconds"] = round(time.perf_counter() - started, 2)
+        return report
+
 # =========================
 # Admin clear helpers (unchanged)
 # =========================
@@ -0,0 +1,261 @@
+# test_import_payments.py — regression checks for storage.import_payments against FakeGitHub
+import io
+from datetime import date, timedelta
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+import pytest
+import streamlit as st
+from streamlit.runtime.secrets import Secrets
+
+from fake_github import FakeGitHub
+
+
+@pytest.fixture()
+def repo():
+    fake = FakeGitHub()
+    base_url = fake.start()
+    # storage_github reads its config from st.secrets at import time.
+    secrets = Secrets()
+    secrets._secrets = {"GITHUB_TOKEN": "test", "GITHUB_API_BASE": base_url}
+    saved, st.secrets = st.secrets, secrets
+    import storage_github as storage
+    storage.TOKEN, storage.API_BASE = "test", base_url
+    storage.OWNER, storage.REPO, storage.BRANCH = fake.owner, fake.repo, fake.branch
+    yield fake, storage
+    st.secrets = saved
+    fake.stop()
+
+
+def _xlsx(df: pd.DataFrame) -> bytes:
+    buf = io.BytesIO()
+    df.to_excel(buf, index=False)
+    return buf.getvalue()
+
+
+def _csv(lines: list[str]) -> io.BytesIO:
+    buf = io.BytesIO("\n".join(lines).encode("utf-8"))
+    buf.name = "history.csv"
+    return buf
+
+
+def _read(fake: FakeGitHub, path: str) -> pd.DataFrame:
+    return pd.read_excel(io.BytesIO(fake.read_file(path)), keep_default_na=False)
+
+
+def _recent(days: int = 1, time: str = "10:00:00") -> str:
+    # Inside the points expiry window whenever the tests run.
+    return f"{date.today() - timedelta(days=days)} {time}"
+
+
+def test_import_into_whole_number_balances(repo):
+    fake, storage = repo
+    fake.seed({
+        "customers.xlsx": _xlsx(pd.DataFrame({"phone": ["12345678", "23456789"], "birthday": "", "total_points": [0.0, 40.0]})),
+    })
+    report = storage.import_payments(_csv([
+        "phone,original_amount,method,timestamp",
+        f"12345678,110.50,Cash,{_recent()}",
+    ]))
+    assert report["imported"] == 1 and report["commit"]
+    customers = _read(fake, "customers.xlsx").set_index("phone")
+    assert customers.loc[12345678, "total_points"] == pytest.approx(110.5)
+    assert customers.loc[23456789, "total_points"] == pytest.approx(40.0)
+
+
+def test_mixed_utc_offsets_are_converted_and_bad_timestamps_rejected(repo, monkeypatch):
+    fake, storage = repo
+    # Pin a non-UTC local zone so wrongly treating a value as offset-aware shows up.
+    monkeypatch.setattr(storage, "tzlocal", lambda: ZoneInfo("America/New_York"))
+    report = storage.import_payments(_csv([
+        "phone,original_amount,method,timestamp",
+        "12345678,10,Cash,2026-10-01T10:00:00+02:00",
+        "12345678,11,Cash,2026-10-01T10:00:00Z",
+        "12345678,12,Cash,2026-10-01 10:00:00",
+        "12345678,13,Cash,not a date",
+        "12345678,14,Cash,2026-10-01T10:00:00+99:99",
+        "12345678,15,Cash,10-01-2026",
+    ]))
+    assert (report["imported"], report["rejected"]) == (4, 2)
+    assert {r["line"] for r in report["rejected_samples"]} == {5, 6}
+    local = lambda ts: pd.Timestamp(ts).tz_convert(storage.tzlocal()).strftime("%Y-%m-%dT%H:%M:%S")
+    stamps = set(_read(fake, "payments.xlsx")["timestamp"])
+    assert stamps == {
+        local("2026-10-01T08:00:00Z"), local("2026-10-01T10:00:00Z"), "2026-10-01T10:00:00",
+        # A dash-separated date ending in the year is naive, not a "-20:26" offset.
+        "2026-10-01T00:00:00",
+    }
+
+
+def test_non_finite_numbers_are_rejected(repo):
+    fake, storage = repo
+    report = storage.import_payments(_csv([
+        "phone,original_amount,method,timestamp,birthday_discount,reward_discount,points_redeemed,final_amount",
+        "12345678,inf,Cash,2026-10-01 10:00:00,,,,",
+        "12345678,10,Cash,2026-10-01 10:01:00,inf,,,",
+        "12345678,10,Cash,2026-10-01 10:02:00,,inf,,",
+        "12345678,10,Cash,2026-10-01 10:03:00,,,inf,",
+        "12345678,10,Cash,2026-10-01 10:04:00,,,,-inf",
+        "12345678,10,Cash,2026-10-01 10:05:00,,,,",
+    ]))
+    assert (report["imported"], report["rejected"]) == (1, 5)
+    assert len(_read(fake, "payments.xlsx")) == 1
+
+
+def test_same_day_repeats_in_file_are_kept(repo):
+    fake, storage = repo
+    rows = [
+        "phone,original_amount,method,timestamp",
+        f"12345678,3.50,Cash,{date.today() - timedelta(days=1)}",
+        f"12345678,3.50,Cash,{date.today() - timedelta(days=1)}",
+    ]
+    report = storage.import_payments(_csv(rows))
+    assert (report["imported"], report["duplicates"]) == (2, 0)
+    customers = _read(fake, "customers.xlsx").set_index("phone")
+    assert customers.loc[12345678, "total_points"] == pytest.approx(7.0)
+    # One more purchase in the next export: only the third copy is new (counted across chunks).
+    report = storage.import_payments(_csv(rows + [rows[-1]]), chunksize=1)
+    assert (report["imported"], report["duplicates"]) == (1, 2)
+    assert len(_read(fake, "payments.xlsx")) == 3
+
+
+def test_dedups_against_stored_rows_in_one_commit_and_reimport_is_a_noop(repo):
+    fake, storage = repo
+    fake.seed({"payments.xlsx": _xlsx(pd.DataFrame([{
+        "phone": 12345678, "original_amount": 20.0, "birthday_discount": 0, "reward_discount": 0,
+        "points_redeemed": 0, "final_amount": 20.0, "method": "Cash", "timestamp": _recent(2).replace(" ", "T"),
+    }]))})
+    rows = [
+        "phone,original_amount,method,timestamp",
+        f"12345678,20,cash,{_recent(2)}",  # already stored (case/format differences ignored)
+        f"12345678,30,Check,{_recent(1)}",
+    ]
+    commits = fake.commit_count()
+    report = storage.import_payments(_csv(rows))
+    assert (report["imported"], report["duplicates"], report["customers_updated"]) == (1, 1, 1)
+    assert fake.commit_count() == commits + 1
+    assert len(_read(fake, "payments.xlsx")) == 2
+    assert _read(fake, "customers.xlsx").set_index("phone").loc[12345678, "total_points"] == pytest.approx(50.0)
+
+    report = storage.import_payments(_csv(rows))
+    assert (report["imported"], report["duplicates"], report["commit"]) == (0, 2, None)
+    assert fake.commit_count() == commits + 1
+
+
+def test_xlsx_is_streamed_in_chunks(repo):
+    fake, storage = repo
+    src = io.BytesIO(_xlsx(pd.DataFrame({
+        "phone": [12345678, 23456789, 1234, 34567890, 45678901],
+        "original_amount": [10, 11, 12, 13, 14],
+        "method": ["Cash", "Check", "Cash", "Credit Card", "Cash"],
+        "timestamp": pd.to_datetime([_recent(1, f"10:0{i}:00") for i in range(5)]),
+    })))
+    report = storage.import_payments(src, "history.xlsx", chunksize=2)
+    assert (report["rows_read"], report["imported"], report["rejected"]) == (5, 4, 1)
+    assert report["rejected_samples"] == [{"line": 4, "reason": "phone must be exactly 8 digits"}]
+    assert set(_read(fake, "payments.xlsx")["phone"]) == {12345678, 23456789, 34567890, 45678901}
+
+
+def test_points_redeemed_adds_redemptions_and_recomputes_balance(repo):
+    fake, storage = repo
+    report = storage.import_payments(_csv([
+        "phone,original_amount,method,timestamp,points_redeemed",
+        f"12345678,200,Cash,{_recent(3)},",
+        f"12345678,50,Cash,{_recent(2)},100",
+    ]))
+    assert report["imported"] == 2
+    redemptions = _read(fake, "redemptions.xlsx")
+    assert redemptions[["phone", "points"]].values.tolist() == [[12345678, 100]]
+    customers = _read(fake, "customers.xlsx").set_index("phone")
+    assert customers.loc[12345678, "total_points"] == pytest.approx(150.0)
+    now = date.today().isoformat()
+    assert storage.calculate_total_points("12345678", now) == pytest.approx(150.0)
+
+
+def test_dry_run_publishes_nothing(repo):
+    fake, storage = repo
+    commits = fake.commit_count()
+    report = storage.import_payments(_csv([
+        "phone,original_amount,method,timestamp",
+        f"12345678,10,Cash,{_recent()}",
+    ]), dry_run=True)
+    assert (report["imported"], report["commit"]) == (1, None)
+    assert fake.commit_count() == commits
+    assert fake.read_file("payments.xlsx") is None
+
+
+def test_rejected_ref_update_is_retried_on_the_new_head(repo, monkeypatch):
+    fake, storage = repo
+    monkeypatch.setattr(storage.time, "sleep", lambda s: None)
+    publish = storage._commit_files
+    calls = []
+
+    def racing_commit(files, message, parent_sha):
+        calls.append(parent_sha)
+        if len(calls) == 1:
+            # A till checks out between our read and our ref update -> 422 not a fast-forward.
+            storage.save_payment("87654321", 9, 0, 0, 0, 9, "Cash", _recent(0))
+        return publish(files, message, parent_sha)
+
+    monkeypatch.setattr(storage, "_commit_files", racing_commit)
+    report = storage.import_payments(_csv([
+        "phone,original_amount,method,timestamp",
+        f"12345678,10,Cash,{_recent()}",
+    ]))
+    assert len(calls) == 2 and calls[0] != calls[1]
+    assert fake.stats["PATCH 422"] == 1
+    assert report["commit"] and report["imported"] == 1
+    assert set(_read(fake, "payments.xlsx")["phone"]) == {12345678, 87654321}
+
+
+@pytest.mark.parametrize("filename", ["history.csv", "history.xlsx"])
+def test_header_is_checked_even_without_data_rows(repo, filename):
+    fake, storage = repo
+    if filename.endswith(".csv"):
+        src = io.BytesIO(b"phone,amount,method,timestamp\n")
+    else:
+        src = io.BytesIO(_xlsx(pd.DataFrame(columns=["phone", "amount", "method", "timestamp"])))
+    with pytest.raises(ValueError, match="original_amount"):
+        storage.import_payments(src, filename)
+
+
+def test_csv_header_names_are_stripped(repo):
+    fake, storage = repo
+    report = storage.import_payments(_csv([
+        "phone, original_amount , method,timestamp",
+        f"12345678,10,Cash,{_recent()}",
+    ]))
+    assert report["imported"] == 1
+
+
+class _NoSeek:
+    """A read-once stream, like a pipe or an HTTP body."""
+
+    def __init__(self, data: bytes):
+        self._buf = io.BytesIO(data)
+
+    def read(self, size: int = -1) -> bytes:
+        return self._buf.read(size)
+
+    def __iter__(self):
+        return iter(self._buf)
+
+
+def test_retry_does_not_reread_a_non_seekable_source(repo, monkeypatch):
+    fake, storage = repo
+    monkeypatch.setattr(storage.time, "sleep", lambda s: None)
+    publish = storage._commit_files
+    calls = []
+
+    def racing_commit(files, message, parent_sha):
+        calls.append(parent_sha)
+        if len(calls) == 1:
+            storage.save_payment("87654321", 9, 0, 0, 0, 9, "Cash", _recent(0))
+        return publish(files, message, parent_sha)
+
+    monkeypatch.setattr(storage, "_commit_files", racing_commit)
+    src = _NoSeek(f"phone,original_amount,method,timestamp\n12345678,10,Cash,{_recent()}\n".encode())
+    report = storage.import_payments(src, "history.csv")
+    assert len(calls) == 2
+    assert (report["rows_read"], report["imported"]) == (1, 1) and report["commit"]
+    assert set(_read(fake, "payments.xlsx")["phone"]) == {12345678, 87654321}
@@ -0,0 +1,75 @@
+# test_loadtest.py — checks for the load-test harness and the fake GitHub it relies on
+import base64
+import json
+
+import pytest
+import requests
+
+from fake_github import FakeGitHub
+from loadtest import _percentile, main
+
+
+@pytest.fixture()
+def fake():
+    fake = FakeGitHub()
+    base_url = fake.start()
+    fake.url = f"{base_url}/repos/{fake.owner}/{fake.repo}"
+    yield fake
+    fake.stop()
+
+
+def _put(fake, path: str, content: bytes, sha: str | None):
+    payload = {"message": "write", "content": base64.b64encode(content).decode(), "branch": fake.branch}
+    if sha:
+        payload["sha"] = sha
+    return requests.put(f"{fake.url}/contents/{path}", json=payload)
+
+
+@pytest.mark.parametrize("values, pct, expected", [
+    (list(range(1, 101)), 95, 95),
+    (list(range(1, 11)), 50, 5),
+    (list(range(1, 101)), 99, 99),
+    (list(range(1, 11)), 95, 10),
+    ([3.0], 99, 3.0),
+    ([], 95, 0.0),
+])
+def test_percentile_is_nearest_rank(values, pct, expected):
+    assert _percentile(values, pct) == expected
+
+
+def test_fake_rejects_put_with_stale_sha(fake):
+    first = _put(fake, "payments.xlsx", b"v1", None)
+    assert first.status_code == 201
+    stale = first.json()["content"]["sha"]
+    assert _put(fake, "payments.xlsx", b"v2", stale).status_code == 200
+    assert _put(fake, "payments.xlsx", b"v3", stale).status_code == 409
+    assert fake.read_file("payments.xlsx") == b"v2"
+
+
+def test_fake_rejects_non_fast_forward_ref_update(fake):
+    head = requests.get(f"{fake.url}/git/ref/heads/{fake.branch}").json()["object"]["sha"]
+    tree = requests.get(f"{fake.url}/git/commits/{head}").json()["tree"]["sha"]
+    commit = requests.post(f"{fake.url}/git/commits", json={"message": "import", "tree": tree, "parents": [head]})
+    # Someone else moves the branch between our read and our ref update.
+    fake.seed({"customers.xlsx": b"till"})
+    r = requests.patch(f"{fake.url}/git/refs/heads/{fake.branch}", json={"sha": commit.json()["sha"], "force": False})
+    assert r.status_code == 422
+    assert fake.read_file("customers.xlsx") == b"till"
+
+
+def test_smoke_run_keeps_data_intact(tmp_path):
+    report, summary_json = tmp_path / "report.md", tmp_path / "report.json"
+    summary = main([
+        "--cashiers", "2", "--visits", "1", "--latency-ms", "0", "--customers", "3",
+        "--report", str(report), "--json", str(summary_json),
+    ])
+    assert summary["cashier_crashes"] == 0
+    assert summary["latency"]["checkout"]["count"] == 2
+    assert summary["latency"]["checkout"]["failed"] == 0
+    integrity = summary["integrity"]
+    for counter in ("lost_payments", "duplicated_payments", "orphan_payments",
+                    "lost_customers", "duplicated_customers", "stale_balances"):
+        assert integrity[counter] == 0, counter
+    assert integrity["redemption_rows"] == integrity["expected_redemptions"]
+    assert report.read_text().startswith("# Load test report")
+    assert json.loads(summary_json.read_text())["integrity"] == integrity